@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 import os
 import sys
+import atexit
 import json
 from pathlib import Path
 from typing import Dict, Any, List
 
 from dotenv import load_dotenv
-from .mistral_ocr import MistralOCRProcessor
+from .mistral_ocr import MistralOCRProcessor, resolve_local_file
 from mcp.server.fastmcp import FastMCP
 from mcp.shared.exceptions import McpError
 from mcp.types import (
@@ -38,13 +39,18 @@ OCR_DIR_PATH = Path("/data/ocr")
 
 print(f"Using OCR directory: {OCR_DIR_PATH}", file=sys.stderr)
 
-if not OCR_DIR_PATH.exists():
-    print(f"Creating OCR directory: {OCR_DIR_PATH}", file=sys.stderr)
-    OCR_DIR_PATH.mkdir(parents=True, exist_ok=True)
-
-# Ensure output directory exists
 OUTPUT_DIR = OCR_DIR_PATH / "output"
-OUTPUT_DIR.mkdir(exist_ok=True)
+
+# Directories are created on first tool use rather than at import
+_dirs_ready = False
+
+def _ensure_dirs() -> None:
+    """Create the OCR and output directories once"""
+    global _dirs_ready
+    if _dirs_ready:
+        return
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    _dirs_ready = True
 
 app = FastMCP(
     name="mcp-mistral-ocr",
@@ -52,49 +58,54 @@ app = FastMCP(
 )
 
 ocr_processor = MistralOCRProcessor(api_key=MISTRAL_API_KEY)
+atexit.register(ocr_processor.close)
+
+# Tool definitions are static, so build them once rather than on every listing
+_TOOLS: List[Tool] = [
+    Tool(
+        name="process_local_file",
+        description="Process a file from the OCR_DIR directory",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "filename": {
+                    "type": "string",
+                    "description": "Name of the file to process",
+                }
+            },
+            "required": ["filename"],
+        }
+    ),
+    Tool(
+        name="process_url_file",
+        description="Process a file from a URL (max 50MB, 1000 pages)",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "url": {
+                    "type": "string",
+                    "description": "URL of the file to process",
+                },
+                "file_type": {
+                    "type": "string",
+                    "description": "Type of file: 'image' or 'pdf'",
+                    "enum": ["image", "pdf"]
+                }
+            },
+            "required": ["url", "file_type"],
+        }
+    )
+]
 
 @app.tool("list_tools")
 async def list_tools() -> List[Tool]:
     """List available tools"""
-    return [
-        Tool(
-            name="process_local_file",
-            description="Process a file from the OCR_DIR directory",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "filename": {
-                        "type": "string",
-                        "description": "Name of the file to process",
-                    }
-                },
-                "required": ["filename"],
-            }
-        ),
-        Tool(
-            name="process_url_file",
-            description="Process a file from a URL (max 50MB, 1000 pages)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "url": {
-                        "type": "string",
-                        "description": "URL of the file to process",
-                    },
-                    "file_type": {
-                        "type": "string",
-                        "description": "Type of file: 'image' or 'pdf'",
-                        "enum": ["image", "pdf"]
-                    }
-                },
-                "required": ["url", "file_type"],
-            }
-        )
-    ]
+    return list(_TOOLS)
 
 @app.tool("process_local_file")
 async def process_local_file(arguments: Dict[str, Any]) -> List[TextContent]:
     """Process a local file from OCR_DIR"""
+    _ensure_dirs()
     filename = arguments.get("filename")
     if not filename:
         raise McpError(ErrorData(
@@ -102,11 +113,13 @@ async def process_local_file(arguments: Dict[str, Any]) -> List[TextContent]:
             message="filename is required"
         ))
     
-    file_path = OCR_DIR_PATH / filename
-    if not file_path.exists():
+    # Only plain filenames naming a regular file inside OCR_DIR are allowed
+    try:
+        file_path = resolve_local_file(OCR_DIR_PATH, filename)
+    except (ValueError, FileNotFoundError) as e:
         raise McpError(ErrorData(
             code=INVALID_PARAMS,
-            message=f"File not found: {filename}"
+            message=str(e)
         ))
     
     try:
@@ -121,6 +134,7 @@ async def process_local_file(arguments: Dict[str, Any]) -> List[TextContent]:
 @app.tool("process_url_file")
 async def process_url_file(arguments: Dict[str, Any]) -> List[TextContent]:
     """Process a file from a URL"""
+    _ensure_dirs()
     url = arguments.get("url")
     file_type = arguments.get("file_type")
     
@@ -1,29 +1,204 @@
 import os
-import json
+import time
 import base64
+import hashlib
+import random
+import asyncio
 from pathlib import Path
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable, BinaryIO
 from urllib.parse import urlparse
 
+import orjson
 from mistralai import Mistral
 
+OCR_MODEL = "mistral-ocr-latest"
+RESULT_CACHE_SIZE = 128
+
+IMAGE_MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+IMAGE_EXTS = frozenset(IMAGE_MIME_TYPES)
+
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+TRANSIENT_MESSAGES = ("rate limit", "overloaded", "quota")
+
+def _is_transient(exc: Exception) -> bool:
+    """Check whether an API error is worth retrying"""
+    if getattr(exc, "status_code", None) in TRANSIENT_STATUS_CODES:
+        return True
+    message = str(exc).lower()
+    return any(marker in message for marker in TRANSIENT_MESSAGES)
+
+async def _call_with_retry(
+    coro_fn: Callable[[], Awaitable[Any]],
+    *,
+    max_attempts: int = 3,
+    base: float = 1.0,
+    cap: float = 10.0,
+) -> Any:
+    """Await coro_fn, retrying transient errors with exponential backoff and jitter"""
+    for attempt in range(max_attempts):
+        try:
+            return await coro_fn()
+        except Exception as e:
+            if attempt == max_attempts - 1 or not _is_transient(e):
+                raise
+            await asyncio.sleep(min(cap, base * 2 ** attempt) + random.uniform(0, 0.25))
+
+def resolve_local_file(ocr_dir: Path, filename: str) -> Path:
+    """Resolve a plain filename to a regular file inside ocr_dir.
+
+    Raises ValueError if the name would escape ocr_dir, and FileNotFoundError
+    if it does not name a regular file.
+    """
+    if "/" in filename or "\\" in filename:
+        raise ValueError(f"Invalid filename: {filename}")
+
+    file_path = (ocr_dir / filename).resolve()
+    if not file_path.is_relative_to(ocr_dir.resolve()):
+        raise ValueError(f"Invalid filename: {filename}")
+
+    if not file_path.is_file():
+        raise FileNotFoundError(f"File not found: {filename}")
+    return file_path
+
+def _positive_env(name: str, default: str, cast: Callable[[str], Any]) -> Any:
+    """Read a numeric environment variable that must be greater than 0"""
+    raw = os.getenv(name, default)
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number greater than 0, got {raw!r}")
+    if value <= 0:
+        raise ValueError(f"{name} must be greater than 0, got {raw!r}")
+    return value
+
+class TokenBucket:
+    """Space out API calls so that at most `rps` requests start per second"""
+
+    def __init__(self, rps: float):
+        self.min_interval = 1.0 / rps
+        self.last_ts = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until the next request slot is available"""
+        async with self._lock:
+            now = time.monotonic()
+            delay = self.last_ts + self.min_interval - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+                now += delay
+            self.last_ts = now
+
 class MistralOCRProcessor:
     def __init__(self, api_key: str):
-        self.api_key = api_key
+        # One client for the process lifetime so connections are kept alive
+        self._client = Mistral(api_key=api_key)
         self.max_file_size = 50 * 1024 * 1024  # 50MB in bytes
+        concurrency = _positive_env("MISTRAL_OCR_CONCURRENCY", "4", int)
+        self._sem = asyncio.Semaphore(concurrency)
+        # Bounds how many local files are held in memory at once
+        self._file_sem = asyncio.Semaphore(concurrency)
+        self._bucket = TokenBucket(_positive_env("MISTRAL_OCR_RPS", "6", float))
+        # JSON results keyed by model and content hash (or URL), FIFO-evicted
+        # once either the entry count or the total size limit is reached
+        self._result_cache: Dict[str, bytes] = {}
+        self._result_cache_bytes = 0
+        self.result_cache_max_bytes = int(
+            float(os.getenv("MISTRAL_OCR_CACHE_MB", "64")) * 1024 * 1024
+        )
+        # Results are appended to a daily JSON-lines file unless per-file saves
+        # are requested
+        self.save_per_file = (
+            os.getenv("OCR_SAVE_PER_FILE", "").lower() in ("1", "true", "yes")
+        )
+        self._jsonl: Optional[BinaryIO] = None
+        self._jsonl_path: Optional[Path] = None
+        self._jsonl_lock = asyncio.Lock()
+
+    async def _call_api(self, fn: Callable[..., Awaitable[Any]], **kwargs) -> Any:
+        """Call a Mistral API method under the concurrency and rate limits,
+        retrying transient failures"""
+        async def attempt() -> Any:
+            async with self._sem:
+                await self._bucket.acquire()
+                return await fn(**kwargs)
 
-    def _save_result(self, result: Dict[str, Any], source_name: str, output_dir: Path) -> None:
+        return await _call_with_retry(attempt)
+
+    async def _save_result(
+        self, result_json: bytes, source_name: str, output_dir: Path
+    ) -> None:
         """Save OCR result to output directory with timestamp"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = output_dir / f"{source_name}_{timestamp}.json"
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        # Nanosecond timestamps keep saves within the same second from colliding
+        timestamp = time.time_ns()
+
+        # Write in a worker thread to keep the event loop free. Per-file saves
+        # write the bytes as-is; JSON-lines records are serialized in the thread
+        if self.save_per_file:
+            output_file = output_dir / f"{source_name}_{timestamp}.json"
+            await asyncio.to_thread(self._write_result, result_json, output_file)
+        else:
+            # Embed the already-serialized result instead of encoding it again
+            record = {
+                "source": source_name,
+                "timestamp": timestamp,
+                "result": orjson.Fragment(result_json),
+            }
+            async with self._jsonl_lock:
+                await asyncio.to_thread(self._append_result, record, output_dir)
+
+    def _write_result(self, result_json: bytes, output_file: Path) -> None:
+        """Write a serialized OCR result to a JSON file"""
+        with open(output_file, 'wb') as f:
+            f.write(result_json)
+
+    def _append_result(self, record: Dict[str, Any], output_dir: Path) -> None:
+        """Append an OCR record to the daily JSON-lines file, rotating on date change"""
+        jsonl_path = output_dir / f"results-{time.strftime('%Y%m%d')}.jsonl"
+        jsonl = self._jsonl
+        if jsonl is None or jsonl_path != self._jsonl_path:
+            self.close()
+            jsonl = open(jsonl_path, 'ab')
+            self._jsonl = jsonl
+            self._jsonl_path = jsonl_path
+
+        jsonl.write(orjson.dumps(record) + b"\n")
+        jsonl.flush()
 
-    def _process_response(self, response) -> str:
-        """Convert OCR response to JSON string"""
-        return json.dumps(response.model_dump(), ensure_ascii=False)
+    def close(self) -> None:
+        """Close the JSON-lines results file, if open"""
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+            self._jsonl_path = None
+
+    def _cache_result(self, key: str, result_json: bytes) -> None:
+        """Store a JSON result, evicting the oldest entries when full"""
+        size = len(result_json)
+        if size > self.result_cache_max_bytes:
+            return
+
+        if key in self._result_cache:
+            self._result_cache_bytes -= len(self._result_cache.pop(key))
+        while self._result_cache and (
+            len(self._result_cache) >= RESULT_CACHE_SIZE
+            or self._result_cache_bytes + size > self.result_cache_max_bytes
+        ):
+            oldest = next(iter(self._result_cache))
+            self._result_cache_bytes -= len(self._result_cache.pop(oldest))
+
+        self._result_cache[key] = result_json
+        self._result_cache_bytes += size
+
+    def _process_response(self, response) -> bytes:
+        """Convert OCR response to compact UTF-8 JSON"""
+        return orjson.dumps(response.model_dump())
 
     async def process_local_file(self, file_path: Path, output_dir: Path) -> str:
         """Process a local file using Mistral's OCR capabilities"""
@@ -37,51 +212,75 @@ class MistralOCRProcessor:
 
         file_extension = file_path.suffix.lower()
 
-        client = Mistral(api_key=self.api_key)
-        
+        source_name = file_path.stem
         try:
-            if file_extension in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
-                # Handle image files with base64 encoding
-                base64_image = self._encode_image(file_path)
-                if not base64_image:
-                    raise ValueError("Failed to encode image")
-
-                response = client.ocr.process(
-                    model="mistral-ocr-latest",
-                    document={
-                        "type": "image_url",
-                        "image_url": f"data:image/jpeg;base64,{base64_image}"
-                    }
-                )
-            else:
-                # Handle PDF and other document types
-                uploaded_file = client.files.upload(
-                    file={
-                        "file_name": file_path.name,
-                        "content": open(file_path, "rb"),
-                    },
-                    purpose="ocr"
-                )
-
-                # Get signed URL for processing
-                signed_url = client.files.get_signed_url(file_id=uploaded_file.id)
-
-                # Process the document
-                response = client.ocr.process(
-                    model="mistral-ocr-latest",
-                    document={
-                        "type": "document_url",
-                        "document_url": signed_url.url,
-                    }
-                )
-
-            # Convert response to JSON string
-            result = self._process_response(response)
+            # Hold a file slot while the file's bytes are in memory, so requests
+            # queued behind the concurrency limit have not read their files yet
+            async with self._file_sem:
+                # Read the file once; the same bytes are hashed, encoded or uploaded
+                content = await asyncio.to_thread(file_path.read_bytes)
+                digest = (await asyncio.to_thread(hashlib.sha256, content)).hexdigest()
+
+                # Reuse the cached result if this exact content was already processed
+                cache_key = f"{OCR_MODEL}:sha256:{digest}"
+                cached = self._result_cache.get(cache_key)
+                if cached is not None:
+                    del content
+                    await self._save_result(cached, source_name, output_dir)
+                    return cached.decode('utf-8')
+
+                if file_extension in IMAGE_EXTS:
+                    # Handle image files with base64 encoding, only on a cache miss
+                    image_url = await asyncio.to_thread(
+                        self._encode_image, content, IMAGE_MIME_TYPES[file_extension]
+                    )
+                    del content
+
+                    response = await self._call_api(
+                        self._client.ocr.process_async,
+                        model=OCR_MODEL,
+                        document={
+                            "type": "image_url",
+                            "image_url": image_url
+                        }
+                    )
+                    del image_url
+                else:
+                    # Handle PDF and other document types. Uploading bytes leaves
+                    # no handle open and lets retries re-send the full content
+                    uploaded_file = await self._call_api(
+                        self._client.files.upload_async,
+                        file={
+                            "file_name": file_path.name,
+                            "content": content,
+                        },
+                        purpose="ocr"
+                    )
+                    del content
+
+                    # Get signed URL for processing
+                    signed_url = await self._call_api(
+                        self._client.files.get_signed_url_async,
+                        file_id=uploaded_file.id,
+                    )
+
+                    # Process the document
+                    response = await self._call_api(
+                        self._client.ocr.process_async,
+                        model=OCR_MODEL,
+                        document={
+                            "type": "document_url",
+                            "document_url": signed_url.url,
+                        }
+                    )
+
+            # Serialize the response once; the same bytes are saved and returned
+            result_json = self._process_response(response)
             
             # Save result to output directory
-            source_name = file_path.stem
-            self._save_result(json.loads(result), source_name, output_dir)
-            return result
+            await self._save_result(result_json, source_name, output_dir)
+            self._cache_result(cache_key, result_json)
+            return result_json.decode('utf-8')
 
         except Exception as e:
             raise Exception(f"Error processing file with Mistral API: {str(e)}")
@@ -92,34 +291,38 @@ class MistralOCRProcessor:
             if file_type not in ["image", "pdf"]:
                 raise ValueError("file_type must be either 'image' or 'pdf'")
 
-            client = Mistral(api_key=self.api_key)
-            response = client.ocr.process(
-                model="mistral-ocr-latest",
+            # Extract filename from URL
+            parsed_url = urlparse(url)
+            source_name = Path(parsed_url.path).stem or 'url_document'
+
+            cache_key = f"{OCR_MODEL}:url:{file_type}:{url}"
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                await self._save_result(cached, source_name, output_dir)
+                return cached.decode('utf-8')
+
+            response = await self._call_api(
+                self._client.ocr.process_async,
+                model=OCR_MODEL,
                 document={
                     "type": "image_url" if file_type == "image" else "document_url",
                     f"{'image' if file_type == 'image' else 'document'}_url": url
                 }
             )
 
-            # Convert response to JSON string
-            result = self._process_response(response)
+            # Serialize the response once; the same bytes are saved and returned
+            result_json = self._process_response(response)
 
-            # Extract filename from URL
-            parsed_url = urlparse(url)
-            source_name = Path(parsed_url.path).stem or 'url_document'
-            
             # Save result to output directory
-            self._save_result(json.loads(result), source_name, output_dir)
-            return result
+            await self._save_result(result_json, source_name, output_dir)
+            self._cache_result(cache_key, result_json)
+            return result_json.decode('utf-8')
 
         except Exception as e:
             raise Exception(f"Error processing URL with Mistral API: {str(e)}")
 
-    def _encode_image(self, image_path: Path) -> Optional[str]:
-        """Encode an image file to base64."""
-        try:
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
-        except Exception as e:
-            print(f"Error encoding image: {e}")
-            return None
+    def _encode_image(self, image: bytes, mime_type: str) -> str:
+        """Encode image bytes to a base64 data URL."""
+        # Build the URL as bytes and decode once to avoid extra copies
+        prefix = f"data:{mime_type};base64,".encode('ascii')
+        return (prefix + base64.b64encode(image)).decode('ascii')
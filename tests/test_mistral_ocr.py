@@ -0,0 +1,184 @@
+import asyncio
+
+import pytest
+from mistralai.models import SDKError
+
+from mcp_mistral_ocr.mistral_ocr import (
+    RESULT_CACHE_SIZE,
+    MistralOCRProcessor,
+    _call_with_retry,
+    resolve_local_file,
+)
+
+
+@pytest.fixture
+def ocr_dir(tmp_path):
+    ocr_dir = tmp_path / "ocr"
+    ocr_dir.mkdir()
+    (ocr_dir / "document.pdf").write_bytes(b"%PDF")
+    (tmp_path / "secret.txt").write_text("secret")
+    return ocr_dir
+
+
+def test_resolves_plain_filename(ocr_dir):
+    assert (
+        resolve_local_file(ocr_dir, "document.pdf")
+        == (ocr_dir / "document.pdf").resolve()
+    )
+
+
+@pytest.mark.parametrize("filename", ["../secret.txt", "..", "a/b", "a\\b"])
+def test_rejects_names_outside_ocr_dir(ocr_dir, filename):
+    with pytest.raises(ValueError):
+        resolve_local_file(ocr_dir, filename)
+
+
+def test_rejects_symlink_pointing_outside(ocr_dir):
+    (ocr_dir / "link.txt").symlink_to(ocr_dir.parent / "secret.txt")
+    with pytest.raises(ValueError):
+        resolve_local_file(ocr_dir, "link.txt")
+
+
+@pytest.mark.parametrize("filename", [".", "missing.pdf"])
+def test_rejects_names_that_are_not_files(ocr_dir, filename):
+    with pytest.raises(FileNotFoundError):
+        resolve_local_file(ocr_dir, filename)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def failing_call(*errors, result="ok"):
+    calls = []
+
+    async def call():
+        calls.append(None)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return call, calls
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_error_then_succeeds(sleeps):
+    call, calls = failing_call(SDKError("Service unavailable", status_code=503))
+    assert await _call_with_retry(call) == "ok"
+    assert len(calls) == 2
+    assert len(sleeps) == 1 and 1.0 <= sleeps[0] <= 1.25
+
+
+@pytest.mark.asyncio
+async def test_raises_non_transient_error_immediately(sleeps):
+    error = SDKError("Bad request", status_code=400)
+    call, calls = failing_call(error)
+    with pytest.raises(SDKError) as excinfo:
+        await _call_with_retry(call)
+    assert excinfo.value is error
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+@pytest.mark.asyncio
+async def test_reraises_last_transient_error_after_max_attempts(sleeps):
+    errors = [SDKError("Rate limited", status_code=429) for _ in range(3)]
+    call, calls = failing_call(*errors)
+    with pytest.raises(SDKError) as excinfo:
+        await _call_with_retry(call, max_attempts=3)
+    assert excinfo.value is errors[-1]
+    assert len(calls) == 3
+    assert len(sleeps) == 2
+
+
+class StubResponse:
+    def __init__(self, result):
+        self.result = result
+
+    def model_dump(self):
+        return self.result
+
+
+class StubOCR:
+    def __init__(self):
+        self.calls = []
+
+    async def process_async(self, **kwargs):
+        self.calls.append(kwargs)
+        return StubResponse({"pages": [{"index": 0, "markdown": "text"}]})
+
+
+class StubClient:
+    def __init__(self):
+        self.ocr = StubOCR()
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.delenv("MISTRAL_OCR_CACHE_MB", raising=False)
+    monkeypatch.delenv("OCR_SAVE_PER_FILE", raising=False)
+    processor = MistralOCRProcessor(api_key="test")
+    processor._client = StubClient()
+    yield processor
+    processor.close()
+
+
+def test_cache_reinsertion_replaces_size(processor):
+    processor._cache_result("a", b"x" * 10)
+    processor._cache_result("a", b"x" * 4)
+    assert processor._result_cache == {"a": b"x" * 4}
+    assert processor._result_cache_bytes == 4
+
+
+def test_cache_evicts_oldest_to_fit_byte_cap(processor):
+    processor.result_cache_max_bytes = 10
+    processor._cache_result("a", b"x" * 5)
+    processor._cache_result("b", b"x" * 5)
+    processor._cache_result("c", b"x" * 5)
+    assert list(processor._result_cache) == ["b", "c"]
+    assert processor._result_cache_bytes == 10
+
+
+def test_cache_skips_entries_larger_than_cap(processor):
+    processor.result_cache_max_bytes = 10
+    processor._cache_result("a", b"x" * 5)
+    processor._cache_result("big", b"x" * 11)
+    assert list(processor._result_cache) == ["a"]
+    assert processor._result_cache_bytes == 5
+
+
+def test_cache_evicts_oldest_at_entry_limit(processor):
+    for i in range(RESULT_CACHE_SIZE + 2):
+        processor._cache_result(str(i), b"x")
+    assert len(processor._result_cache) == RESULT_CACHE_SIZE
+    assert "0" not in processor._result_cache and "1" not in processor._result_cache
+    assert processor._result_cache_bytes == RESULT_CACHE_SIZE
+
+
+def test_cache_disabled_with_zero_mb(monkeypatch):
+    monkeypatch.setenv("MISTRAL_OCR_CACHE_MB", "0")
+    processor = MistralOCRProcessor(api_key="test")
+    processor._cache_result("a", b"x")
+    assert processor._result_cache == {}
+    assert processor._result_cache_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_skips_api_and_still_saves(processor, tmp_path):
+    url = "https://example.com/scan.png"
+    first = await processor.process_url_file(url, "image", tmp_path)
+    second = await processor.process_url_file(url, "image", tmp_path)
+
+    assert second == first
+    assert len(processor._client.ocr.calls) == 1
+    (jsonl_path,) = tmp_path.glob("results-*.jsonl")
+    lines = jsonl_path.read_bytes().splitlines()
+    assert len(lines) == 2
+    assert all(b'"source":"scan"' in line for line in lines)